@@ -6,7 +6,8 @@ from examples.llm.src.models.layers.attention import (
     attn_bias_shape, flash_attn_fn, scaled_multihead_dot_product_attention,
     triton_flash_attn_fn)
 from examples.llm.src.models.layers.gpt_blocks import GPTMLP, GPTBlock
-from examples.llm.src.models.layers.norm import NORM_CLASS_REGISTRY
+from examples.llm.src.models.layers.norm import (NORM_CLASS_REGISTRY,
+                                                 FusedLayerNorm)
 
 __all__ = [
     'scaled_multihead_dot_product_attention',
@@ -20,4 +21,5 @@ __all__ = [
     'GPTMLP',
     'GPTBlock',
     'NORM_CLASS_REGISTRY',
+    'FusedLayerNorm',
 ]
@@ -11,7 +11,6 @@ import torch
 import torch.nn as nn
 from composer.algorithms.low_precision_layernorm.low_precision_layernorm import \
     LPLayerNorm
-from einops import rearrange
 from torch import nn
 
 
@@ -42,10 +41,11 @@ def scaled_multihead_dot_product_attention(
     multiquery=False,
 ):
 
-    q = rearrange(query, 'b s (h d) -> b h s d', h=n_heads)
-    k = rearrange(key, 'b s (h d) -> b h d s',
-                  h=1 if multiquery else n_heads)  # includes key.t()
-    v = rearrange(value, 'b s (h d) -> b h s d', h=1 if multiquery else n_heads)
+    kv_n_heads = 1 if multiquery else n_heads
+    q = query.view(*query.shape[:2], n_heads, -1).transpose(1, 2)
+    k = key.view(*key.shape[:2], kv_n_heads, -1)
+    k = k.permute(0, 2, 3, 1)  # includes key.t()
+    v = value.view(*value.shape[:2], kv_n_heads, -1).transpose(1, 2)
 
     min_val = torch.finfo(q.dtype).min
 
@@ -55,6 +55,9 @@ def scaled_multihead_dot_product_attention(
     if softmax_scale is None:
         softmax_scale = 1 / math.sqrt(d)
 
+    # attn_weight is a fresh (b, h, s_q, s_k) tensor which is not saved for
+    # backward, so masks are applied in place instead of allocating a new
+    # score matrix per mask
     attn_weight = q.matmul(k) * softmax_scale
 
     if attn_bias is not None:
@@ -75,8 +78,8 @@ def scaled_multihead_dot_product_attention(
                 'into attn_bias once and passing that to each attention ' +\
                 'module instead.'
             )
-        attn_weight = attn_weight.masked_fill(
-            ~key_padding_mask.view((b, 1, 1, s_k)), min_val)
+        attn_weight.masked_fill_(~key_padding_mask.view((b, 1, 1, s_k)),
+                                 min_val)
 
     if is_causal:
         s = max(s_q, s_k)
@@ -85,8 +88,7 @@ def scaled_multihead_dot_product_attention(
         causal_mask = causal_mask.to(torch.bool)
         causal_mask = ~causal_mask
         causal_mask = causal_mask[-s_q:, -s_k:]
-        attn_weight = attn_weight.masked_fill(causal_mask.view(1, 1, s_q, s_k),
-                                              min_val)
+        attn_weight.masked_fill_(causal_mask.view(1, 1, s_q, s_k), min_val)
 
     attn_weight = torch.softmax(attn_weight, dim=-1)
 
@@ -97,7 +99,7 @@ def scaled_multihead_dot_product_attention(
                                                   inplace=True)
 
     out = attn_weight.matmul(v)
-    out = rearrange(out, 'b h s d -> b s (h d)')
+    out = out.transpose(1, 2).reshape(b, s_q, -1)
 
     if needs_weights:
         return out, attn_weight
@@ -138,25 +140,38 @@ def flash_attn_fn(
         raise NotImplementedError(f'attn_bias not implemented for flash attn.')
 
     batch_size, seqlen = query.shape[:2]
+    kv_n_heads = 1 if multiquery else n_heads
 
     if key_padding_mask is None:
-        key_padding_mask = torch.ones_like(key[:, :, 0], dtype=torch.bool)
-    query_padding_mask = key_padding_mask[:, -query.size(1):]
+        # without padding every sequence is full length; flatten the batch
+        # instead of gathering (and later scattering) the unpadded tokens
+        s_k = key.size(1)
+        query_unpad = query.reshape(batch_size * seqlen, n_heads, -1)
+        key_unpad = key.reshape(batch_size * s_k, kv_n_heads, -1)
+        value_unpad = value.reshape(batch_size * s_k, kv_n_heads, -1)
+        cu_seqlens_q = torch.arange(0, (batch_size + 1) * seqlen,
+                                    step=seqlen,
+                                    dtype=torch.int32,
+                                    device=query.device)
+        cu_seqlens_k = torch.arange(0, (batch_size + 1) * s_k,
+                                    step=s_k,
+                                    dtype=torch.int32,
+                                    device=key.device)
+        max_seqlen_q, max_seqlen_k = seqlen, s_k
+        indices_q = None
+    else:
+        query_padding_mask = key_padding_mask[:, -query.size(1):]
 
-    query_unpad, indices_q, cu_seqlens_q, max_seqlen_q = bert_padding.unpad_input(
-        query, query_padding_mask)
-    query_unpad = rearrange(query_unpad, 'nnz (h d) -> nnz h d', h=n_heads)
+        query_unpad, indices_q, cu_seqlens_q, max_seqlen_q = bert_padding.unpad_input(
+            query, query_padding_mask)
+        query_unpad = query_unpad.view(query_unpad.size(0), n_heads, -1)
 
-    key_unpad, _, cu_seqlens_k, max_seqlen_k = bert_padding.unpad_input(
-        key, key_padding_mask)
-    key_unpad = rearrange(key_unpad,
-                          'nnz (h d) -> nnz h d',
-                          h=1 if multiquery else n_heads)
+        key_unpad, _, cu_seqlens_k, max_seqlen_k = bert_padding.unpad_input(
+            key, key_padding_mask)
+        key_unpad = key_unpad.view(key_unpad.size(0), kv_n_heads, -1)
 
-    value_unpad, _, _, _ = bert_padding.unpad_input(value, key_padding_mask)
-    value_unpad = rearrange(value_unpad,
-                            'nnz (h d) -> nnz h d',
-                            h=1 if multiquery else n_heads)
+        value_unpad, _, _, _ = bert_padding.unpad_input(value, key_padding_mask)
+        value_unpad = value_unpad.view(value_unpad.size(0), kv_n_heads, -1)
 
     if multiquery:
         # Expanding a tensor does not allocate new memory, but only creates a new
@@ -187,9 +202,12 @@ def flash_attn_fn(
         causal=reset_is_causal,
         return_attn_probs=needs_weights)
 
-    output = bert_padding.pad_input(
-        rearrange(output_unpad, 'nnz h d -> nnz (h d)'), indices_q, batch_size,
-        seqlen)
+    if indices_q is None:
+        output = output_unpad.view(batch_size, seqlen, -1)
+    else:
+        output = bert_padding.pad_input(
+            output_unpad.view(output_unpad.size(0), -1), indices_q, batch_size,
+            seqlen)
     return output, None
 
 
@@ -231,19 +249,19 @@ def triton_flash_attn_fn(
             'module instead.'
         )
         b_size, s_k = key_padding_mask.shape[:2]
+        cannot_attend = ~key_padding_mask.view((b_size, 1, 1, s_k))
+        min_val = torch.finfo(query.dtype).min
 
         if attn_bias is None:
+            # freshly allocated so the mask can be filled in place
             attn_bias = query.new_zeros(b_size, 1, 1, s_k)
+            attn_bias.masked_fill_(cannot_attend, min_val)
+        else:
+            attn_bias = attn_bias.masked_fill(cannot_attend, min_val)
 
-        attn_bias = attn_bias.masked_fill(
-            ~key_padding_mask.view((b_size, 1, 1, s_k)),
-            torch.finfo(query.dtype).min)
-
-    query = rearrange(query, 'b s (h d) -> b s h d', h=n_heads)
-    key = rearrange(key, 'b s (h d) -> b s h d', h=1 if multiquery else n_heads)
-    value = rearrange(value,
-                      'b s (h d) -> b s h d',
-                      h=1 if multiquery else n_heads)
+    query = query.view(*query.shape[:2], n_heads, -1)
+    key = key.view(*key.shape[:2], 1 if multiquery else n_heads, -1)
+    value = value.view(*value.shape[:2], 1 if multiquery else n_heads, -1)
 
     if multiquery:
         # Expanding a tensor does not allocate new memory, but only creates a new
@@ -510,6 +528,10 @@ def attn_bias_shape(attn_impl, n_heads, seq_len, alibi, prefix_lm, causal,
         if alibi:
             if (prefix_lm or not causal) or use_sequence_id:
                 return (1, n_heads, seq_len, seq_len)
+            # with causal attention, the alibi bias of each query row only
+            # differs by a constant which softmax is invariant to; a single
+            # row is broadcast by the kernels so no (seq_len, seq_len) bias
+            # is ever materialized
             return (1, n_heads, 1, seq_len)
         elif prefix_lm or use_sequence_id:
             return (1, 1, seq_len, seq_len)
@@ -564,16 +586,18 @@ def alibi_bias(n_heads,
                alibi_bias_max=8,
                device=None,
                dtype=None):
-    alibi_bias = torch.arange(1 - seq_len, 1, dtype=torch.int32,
-                              device=device).view(1, 1, 1, seq_len)
+    slopes = gen_slopes(n_heads, alibi_bias_max, device=device)
+    ramp = torch.arange(1 - seq_len, 1, dtype=torch.int32, device=device)
     if full:
         # generate 1 x Heads x SeqLen x SeqLen alibi bias mask
         # otherwise the mask is 1 x Heads x 1 x SeqLen (which is broadcast to the appropriate size)
-        alibi_bias = alibi_bias - torch.arange(
-            1 - seq_len, 1, dtype=torch.int32, device=device).view(
-                1, 1, seq_len, 1)
-        alibi_bias = alibi_bias.abs().mul(-1)
+        # -|i - j| is built from a single ramp with the sign folded into the
+        # (n_heads sized) slopes, so that each SeqLen x SeqLen pass is one op
+        alibi_bias = (ramp.view(1, 1, 1, seq_len) -
+                      ramp.view(1, 1, seq_len, 1)).abs_()
+        slopes = slopes.neg()
+    else:
+        alibi_bias = ramp.view(1, 1, 1, seq_len)
 
-    slopes = gen_slopes(n_heads, alibi_bias_max, device=device)
     alibi_bias = alibi_bias * slopes
     return alibi_bias.to(dtype=dtype)
@@ -10,7 +10,8 @@ import torch.nn as nn
 
 from examples.llm.src.models.layers.attention import (MultiheadAttention,
                                                       MultiQueryAttention)
-from examples.llm.src.models.layers.norm import NORM_CLASS_REGISTRY
+from examples.llm.src.models.layers.norm import (NORM_CLASS_REGISTRY,
+                                                 FusedLayerNorm)
 
 
 class GPTMLP(nn.Module):
@@ -18,14 +19,54 @@ class GPTMLP(nn.Module):
     def __init__(self,
                  d_model: int,
                  mlp_ratio: int,
+                 mlp_impl: str = 'torch',
+                 mlp_act: str = 'gelu',
                  device: Optional[str] = None):
         super().__init__()
+        self.mlp_impl = mlp_impl
         self.mlp_up = nn.Linear(d_model, mlp_ratio * d_model, device=device)
-        self.mlp_act = nn.GELU(approximate='none')
+        self.mlp_gate = None
+        if mlp_act == 'gelu':
+            self.mlp_act = nn.GELU(approximate='none')
+        elif mlp_act == 'gelu_tanh':
+            self.mlp_act = nn.GELU(approximate='tanh')
+        elif mlp_act == 'swiglu':
+            self.mlp_gate = nn.Linear(d_model,
+                                      mlp_ratio * d_model,
+                                      device=device)
+            self.mlp_act = nn.SiLU()
+        else:
+            raise ValueError(f'{mlp_act=} is an invalid setting.')
         self.mlp_down = nn.Linear(mlp_ratio * d_model, d_model, device=device)
         self.mlp_down._is_residual = True  # type: ignore
 
+        if self.mlp_impl == 'flash':
+            if mlp_act != 'gelu_tanh':
+                raise NotImplementedError(
+                    'mlp_impl=flash is only implemented with mlp_act=gelu_tanh.'
+                )
+            try:
+                from flash_attn.ops import fused_dense  # type: ignore
+            except ImportError as e:
+                raise e
+            self.fused_mlp_fn = fused_dense.fused_mlp_func
+        elif self.mlp_impl != 'torch':
+            raise ValueError(f'{mlp_impl=} is an invalid setting.')
+
     def forward(self, x):
+        if self.mlp_impl == 'flash':
+            # the bias add and GELU are fused into the epilogue of the up
+            # projection GEMM; note: the fused kernel uses the tanh
+            # approximation of GELU
+            return self.fused_mlp_fn(x,
+                                     self.mlp_up.weight,
+                                     self.mlp_down.weight,
+                                     bias1=self.mlp_up.bias,
+                                     bias2=self.mlp_down.bias,
+                                     activation='gelu_approx')
+        if self.mlp_gate is not None:
+            return self.mlp_down(
+                self.mlp_act(self.mlp_gate(x)) * self.mlp_up(x))
         return self.mlp_down(self.mlp_act(self.mlp_up(x)))
 
 
@@ -44,6 +85,8 @@ class GPTBlock(nn.Module):
                  resid_pdrop: float = 0.0,
                  norm_type: str = 'low_precision_layernorm',
                  multiquery_attention: bool = False,
+                 mlp_impl: str = 'torch',
+                 mlp_act: str = 'gelu',
                  device: Optional[str] = None,
                  **kwargs):
         del kwargs  # unused, just to capture any extra args from the config
@@ -67,6 +110,8 @@ class GPTBlock(nn.Module):
         self.mlp = GPTMLP(
             d_model=d_model,
             mlp_ratio=mlp_ratio,
+            mlp_impl=mlp_impl,
+            mlp_act=mlp_act,
             device=device,
         )
         self.resid_attn_dropout = nn.Dropout(resid_pdrop)
@@ -77,7 +122,7 @@ class GPTBlock(nn.Module):
         x: torch.Tensor,
         past_key_value: Optional[Tuple[torch.Tensor]] = None,
         attn_bias: Optional[torch.Tensor] = None,
-        attention_mask: Optional[torch.ByteTensor] = None,
+        attention_mask: Optional[torch.BoolTensor] = None,
         is_causal: bool = True,
     ) -> Tuple[torch.Tensor, Optional[Tuple[torch.Tensor]]]:
         a = self.norm_1(x)
@@ -86,8 +131,16 @@ class GPTBlock(nn.Module):
                                          attn_bias=attn_bias,
                                          attention_mask=attention_mask,
                                          is_causal=is_causal)
-        x = x + self.resid_attn_dropout(b)
-        m = self.norm_2(x)
+        if isinstance(self.norm_2, FusedLayerNorm):
+            # fuse the residual dropout and add into the norm_2 kernel
+            m, x = self.norm_2(
+                b,
+                residual=x,
+                dropout_p=self.resid_attn_dropout.p if self.training else 0.0,
+                prenorm=True)
+        else:
+            x = x + self.resid_attn_dropout(b)
+            m = self.norm_2(x)
         n = self.mlp(m)
         x = x + self.resid_mlp_dropout(n)
         return x, past_key_value
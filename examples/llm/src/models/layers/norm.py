@@ -50,6 +50,62 @@ class LPLayerNorm(torch.nn.LayerNorm):
             )
 
 
+class FusedLayerNorm(torch.nn.LayerNorm):
+    """LayerNorm computed with flash-attn's fused (single pass) kernel.
+
+    The kernel can also apply dropout to its input and add a residual before
+    normalizing (see ``GPTBlock``), saving the elementwise kernels (and
+    associated memory traffic) of ``x + dropout(b)``.
+    """
+
+    def __init__(
+        self,
+        normalized_shape,
+        eps=1e-05,
+        elementwise_affine=True,
+        device=None,
+        dtype=None,
+    ):
+        if not elementwise_affine:
+            raise ValueError('FusedLayerNorm requires elementwise_affine=True.')
+        super().__init__(
+            normalized_shape=normalized_shape,
+            eps=eps,
+            elementwise_affine=elementwise_affine,
+            device=device,
+            dtype=dtype,
+        )
+        # the kernel requires a bias; this stands in for it when the model is
+        # created with no_bias=True (it is not saved to the state dict)
+        self.register_buffer('zero_bias',
+                             torch.zeros_like(self.weight),
+                             persistent=False)
+
+    def reset_parameters(self):
+        super().reset_parameters()
+        # also called by nn.LayerNorm.__init__ before zero_bias exists
+        if hasattr(self, 'zero_bias'):
+            torch.nn.init.zeros_(self.zero_bias)
+
+    def forward(self, x, residual=None, dropout_p=0.0, prenorm=False):
+        try:
+            from flash_attn.ops.layer_norm import \
+                dropout_add_layer_norm  # type: ignore
+        except ImportError as e:
+            raise e
+
+        bias = self.bias if self.bias is not None else self.zero_bias
+        # returns (norm(residual + dropout(x)), residual + dropout(x)) if
+        # prenorm else norm(residual + dropout(x))
+        return dropout_add_layer_norm(x.contiguous(),
+                                      residual,
+                                      self.weight,
+                                      bias,
+                                      dropout_p,
+                                      self.eps,
+                                      prenorm=prenorm)
+
+
 def rms_norm(x, weight=None, eps=1e-5):
     output = x / torch.rsqrt(x.pow(2).mean(-1, keepdim=True) + eps)
     if weight is not None:
@@ -109,6 +165,7 @@ class LPRMSNorm(RMSNorm):
 NORM_CLASS_REGISTRY = {
     'layernorm': torch.nn.LayerNorm,
     'low_precision_layernorm': LPLayerNorm,
+    'fused_layernorm': FusedLayerNorm,
     'rmsnorm': RMSNorm,
     'low_precision_rmsnorm': LPRMSNorm,
 }
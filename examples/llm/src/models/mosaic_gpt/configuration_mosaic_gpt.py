@@ -46,6 +46,9 @@ class MosaicGPTConfig(PretrainedConfig):
         embedding_fraction: float = 1.0,
         norm_type: str = 'low_precision_layernorm',
         multiquery_attention: bool = False,
+        mlp_impl: str = 'torch',
+        mlp_act: str = 'gelu',
+        activation_checkpointing_target: str = 'block',
         use_cache: bool = False,
         **kwargs,
     ):
@@ -92,8 +95,20 @@ class MosaicGPTConfig(PretrainedConfig):
             fan_mode (str): The fan mode to use for parameter initialization with kaiming initialization schemes.
             init_nonlinearity (str): The nonlinearity to use for parameter initialization with kaiming initialization schemes.
             embedding_fraction (float): The fraction to scale the gradients of the embedding layer by.
-            norm_type (str): choose type of norm to use
+            norm_type (str): choose type of norm to use. 'fused_layernorm' uses the fused LayerNorm kernels from
+                flash-attn and additionally fuses the attention residual dropout and add into the second norm of each block.
+                The kernels require d_model to be a multiple of 8 and at most 6144.
             multiquery_attention (bool): Whether to use multiquery attention implementation.
+            mlp_impl (str): The MLP implementation to use. One of 'torch' or 'flash'. 'flash' uses the fused dense
+                kernels from flash-attn which fuse the bias add and the (tanh approximated) GELU into the up projection,
+                so it requires mlp_act='gelu_tanh'.
+            mlp_act (str): The MLP activation to use. One of 'gelu', 'gelu_tanh' (tanh approximated GELU) or 'swiglu'.
+                'swiglu' adds a gate projection to the MLP. 'gelu' and 'swiglu' are only supported with mlp_impl='torch'.
+            activation_checkpointing_target (str): The modules to activation checkpoint when activation checkpointing
+                is enabled in the fsdp_config. One of 'block' (each GPTBlock), 'attn' (only the attention modules, which
+                avoids recomputing the MLP in the backward pass at the cost of keeping its activations) or 'norm' (only the
+                norm_1 and norm_2 modules of each block, which recomputes only the cheap normalizations and keeps the
+                attention and MLP activations).
             use_cache (bool): Whether or not the model should return the last key/values attentions
         """
         self.d_model = d_model
@@ -129,6 +144,9 @@ class MosaicGPTConfig(PretrainedConfig):
         self.embedding_fraction = embedding_fraction
         self.norm_type = norm_type
         self.multiquery_attention = multiquery_attention
+        self.mlp_impl = mlp_impl
+        self.mlp_act = mlp_act
+        self.activation_checkpointing_target = activation_checkpointing_target
         self.use_cache = use_cache
         if 'name' in kwargs:
             del kwargs['name']
@@ -148,6 +166,24 @@ class MosaicGPTConfig(PretrainedConfig):
             )
         if self.attn_impl not in ['torch', 'flash', 'triton']:
             raise ValueError(f'Unknown attn_impl={self.attn_impl}')
+        if self.mlp_impl not in ['torch', 'flash']:
+            raise ValueError(f'Unknown mlp_impl={self.mlp_impl}')
+        if self.mlp_act not in ['gelu', 'gelu_tanh', 'swiglu']:
+            raise ValueError(f'Unknown mlp_act={self.mlp_act}')
+        if self.mlp_impl == 'flash' and self.mlp_act != 'gelu_tanh':
+            raise NotImplementedError(
+                'mlp_impl=flash is only implemented with mlp_act=gelu_tanh.')
+        if self.norm_type == 'fused_layernorm' and (self.d_model % 8 != 0 or
+                                                    self.d_model > 6144):
+            raise ValueError(
+                'fused_layernorm requires d_model to be a multiple of 8 and at most 6144.'
+            )
+        if self.activation_checkpointing_target not in [
+                'block', 'attn', 'norm'
+        ]:
+            raise ValueError(
+                f'Unknown activation_checkpointing_target={self.activation_checkpointing_target}'
+            )
         if self.prefix_lm and self.attn_impl not in ['torch', 'triton']:
             raise NotImplementedError(
                 'prefix_lm only implemented with torch and triton attention.')
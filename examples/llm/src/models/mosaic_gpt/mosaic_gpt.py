@@ -71,6 +71,8 @@ class MosaicGPT(PreTrainedModel):
                                  config.d_model,
                                  device=config.init_device)
             })
+            # position indices are built once and sliced in each forward pass
+            self._pos_ids = None
         self.transformer.update({'emb_drop': nn.Dropout(config.emb_pdrop)})
         self.transformer.update({
             'blocks':
@@ -116,6 +118,12 @@ class MosaicGPT(PreTrainedModel):
             prefix_lm=self.prefix_lm,
             causal=self.is_causal,
             use_sequence_id=self.attn_uses_sequence_id)
+        if config.init_device != 'meta':
+            # attn_bias only depends on the config so it can be built once
+            # here instead of during the first forward pass; models
+            # initialized on the meta device build it lazily after they
+            # are materialized
+            self._init_attn_bias(device=config.init_device, dtype=torch.float32)
 
         if config.no_bias:
             for module in self.modules():
@@ -128,27 +136,31 @@ class MosaicGPT(PreTrainedModel):
         if config.verbose and config.verbose > 2:
             print(self)
 
+    @torch.no_grad()
+    def _init_attn_bias(self, device, dtype):
+        if self.attn_bias_shape:
+            self.attn_bias = torch.zeros(self.attn_bias_shape,
+                                         device=device,
+                                         dtype=dtype)
+            self.attn_bias = attention.attn_bias(
+                self.attn_impl,
+                self.attn_bias,
+                self.config.n_heads,
+                self.config.max_seq_len,
+                causal=self.is_causal,
+                alibi=self.alibi,
+                alibi_bias_max=self.alibi_bias_max)
+        self._attn_bias_initialized = True
+
     @torch.no_grad()
     def _attn_bias(self,
                    device,
                    dtype,
-                   attention_mask: Optional[torch.ByteTensor] = None,
-                   prefix_mask: Optional[torch.ByteTensor] = None,
+                   attention_mask: Optional[torch.BoolTensor] = None,
+                   prefix_mask: Optional[torch.BoolTensor] = None,
                    sequence_id: Optional[torch.LongTensor] = None):
         if not self._attn_bias_initialized:
-            if self.attn_bias_shape:
-                self.attn_bias = torch.zeros(self.attn_bias_shape,
-                                             device=device,
-                                             dtype=dtype)
-                self.attn_bias = attention.attn_bias(
-                    self.attn_impl,
-                    self.attn_bias,
-                    self.config.n_heads,
-                    self.config.max_seq_len,
-                    causal=self.is_causal,
-                    alibi=self.alibi,
-                    alibi_bias_max=self.alibi_bias_max)
-            self._attn_bias_initialized = True
+            self._init_attn_bias(device, dtype)
 
         # flash does not support prefix_lm and will incorporate any
         # attention_mask inside the attention module
@@ -161,17 +173,30 @@ class MosaicGPT(PreTrainedModel):
             self.attn_bias = self.attn_bias.to(dtype=dtype, device=device)
 
         attn_bias = self.attn_bias
+        # the prefix, sequence_id and padding masks are combined into a single
+        # bool mask so that the (possibly batch_size x n_heads x S x S) bias is
+        # only masked (and copied) once
+        cannot_attend = None
 
         # If using torch or triton, we incorporate the prefix_mask (if appropriate)
         if self.prefix_lm:
             assert isinstance(attn_bias, torch.Tensor)  # pyright
             assert isinstance(prefix_mask, torch.Tensor)  # pyright
-            attn_bias = self._apply_prefix_mask(attn_bias, prefix_mask)
+            cannot_attend = self._prefix_cannot_attend(attn_bias, prefix_mask)
+            seq_len = cannot_attend.shape[-1]
+            attn_bias = attn_bias[..., :seq_len, :seq_len]
 
         # If using torch or triton, we incorporate sequence_id (if appropriate)
         if self.attn_uses_sequence_id and sequence_id is not None:
             assert isinstance(attn_bias, torch.Tensor)  # pyright
-            attn_bias = self._apply_sequence_id(attn_bias, sequence_id)
+            seq_cannot_attend = self._sequence_id_cannot_attend(sequence_id)
+            seq_len = seq_cannot_attend.shape[-1]
+            attn_bias = attn_bias[..., :seq_len, :seq_len]
+            if cannot_attend is None:
+                cannot_attend = seq_cannot_attend
+            else:
+                cannot_attend = torch.logical_or(
+                    cannot_attend[..., :seq_len, :seq_len], seq_cannot_attend)
 
         # If using torch or triton, we incorporate attention_mask. This will output
         # None in place of attention_mask since it will not be further needed in the
@@ -190,14 +215,32 @@ class MosaicGPT(PreTrainedModel):
                     f'attention_mask shape={attention_mask.shape} ' +\
                     f'and prefix_mask shape={prefix_mask.shape} are not equal.'
                 )
+            pad_cannot_attend = ~attention_mask.view(-1, 1, 1, s_k)
+            if cannot_attend is None:
+                cannot_attend = pad_cannot_attend
+            else:
+                cannot_attend = torch.logical_or(cannot_attend[:, :, :, -s_k:],
+                                                 pad_cannot_attend)
+
+        if cannot_attend is not None:
+            assert isinstance(attn_bias, torch.Tensor)  # pyright
             min_val = torch.finfo(attn_bias.dtype).min
-            attn_bias = attn_bias.masked_fill(
-                ~attention_mask.view(-1, 1, 1, s_k), min_val)
+            attn_bias = attn_bias.masked_fill(cannot_attend, min_val)
 
         return attn_bias, None
 
-    def _apply_prefix_mask(self, attn_bias: torch.Tensor,
-                           prefix_mask: torch.Tensor):
+    def _position_ids(self, device):
+        # kept as a plain attribute rather than a buffer so that it is not
+        # left uninitialized when a model initialized on the meta device is
+        # materialized; rebuilt if the model is moved to a different device
+        if self._pos_ids is None or self._pos_ids.device != device:
+            self._pos_ids = torch.arange(self.config.max_seq_len,
+                                         dtype=torch.long,
+                                         device=device).unsqueeze(0)
+        return self._pos_ids
+
+    def _prefix_cannot_attend(self, attn_bias: torch.Tensor,
+                              prefix_mask: torch.Tensor) -> torch.Tensor:
         s_k, s_q = attn_bias.shape[-2:]
         if (s_k != self.config.max_seq_len) or (s_q != self.config.max_seq_len):
             raise ValueError(
@@ -211,9 +254,6 @@ class MosaicGPT(PreTrainedModel):
                 f'prefix_mask sequence length cannot exceed max_seq_len={self.config.max_seq_len}'
             )
 
-        # select seq_len subset of attn mask
-        attn_bias = attn_bias[..., :seq_len, :seq_len]
-
         # Mix the causal max and the bidirectional mask to get the full
         # allowable attention (i.e. full = not accounting for padding yet)
         causal = torch.tril(
@@ -221,40 +261,28 @@ class MosaicGPT(PreTrainedModel):
                        dtype=torch.bool,
                        device=prefix_mask.device)).view(1, 1, seq_len, seq_len)
         prefix = prefix_mask.view(-1, 1, 1, seq_len)
-        cannot_attend = ~torch.logical_or(causal, prefix.bool())
+        return ~torch.logical_or(causal, prefix)
 
-        min_val = torch.finfo(attn_bias.dtype).min
-        attn_bias = attn_bias.masked_fill(cannot_attend, min_val)
-
-        return attn_bias
-
-    def _apply_sequence_id(self, attn_bias: torch.Tensor,
-                           sequence_id: torch.LongTensor):
+    def _sequence_id_cannot_attend(
+            self, sequence_id: torch.LongTensor) -> torch.Tensor:
         seq_len = sequence_id.shape[-1]
         if seq_len > self.config.max_seq_len:
             raise ValueError(
                 f'sequence_id sequence length cannot exceed max_seq_len={self.config.max_seq_len}'
             )
 
-        # select seq_len subset of attn mask
-        attn_bias = attn_bias[..., :seq_len, :seq_len]
-
         # Restrict attention to tokens that share the same value
         # in sequence_id
-        cannot_attend = torch.logical_not(
+        return torch.logical_not(
             torch.eq(sequence_id.view(-1, seq_len, 1),
                      sequence_id.view(-1, 1, seq_len))).unsqueeze(1)
-        min_val = torch.finfo(attn_bias.dtype).min
-        attn_bias = attn_bias.masked_fill(cannot_attend, min_val)
-
-        return attn_bias
 
     def forward(
             self,
             input_ids: torch.LongTensor,
             past_key_values: Optional[List[Tuple[torch.FloatTensor]]] = None,
-            attention_mask: Optional[torch.ByteTensor] = None,
-            prefix_mask: Optional[torch.ByteTensor] = None,
+            attention_mask: Optional[torch.BoolTensor] = None,
+            prefix_mask: Optional[torch.BoolTensor] = None,
             sequence_id: Optional[torch.LongTensor] = None,
             return_dict: Optional[bool] = None,
             output_attentions: Optional[bool] = None,
@@ -273,10 +301,23 @@ class MosaicGPT(PreTrainedModel):
             raise NotImplementedError(
                 'output_attentions is not implemented yet for MosaicGPT')
 
-        if attention_mask is not None and attention_mask[:, 0].sum(
-        ) != attention_mask.shape[0] and self.training:
-            raise NotImplementedError(
-                'MosaicGPT does not support training with left padding.')
+        # check self.training first; the padding checks below require a
+        # device sync which should not be paid for during eval / generation
+        # (and are data dependent, so they can not be traced for export)
+        if self.training and attention_mask is not None:
+            # positions at which no sequence in the batch is padded; both
+            # checks are read from it with a single sync
+            unpadded = attention_mask.all(dim=0)
+            no_left_padding, no_padding = torch.stack(
+                (unpadded[0], unpadded.all())).tolist()
+            if not no_left_padding:
+                raise NotImplementedError(
+                    'MosaicGPT does not support training with left padding.')
+            if no_padding:
+                # without padding the mask is a no-op; dropping it skips the
+                # padding bias computation and lets the attention kernels use
+                # their (faster) causal-only path
+                attention_mask = None
 
         if self.prefix_lm and prefix_mask is None:
             raise ValueError(
@@ -302,7 +343,15 @@ class MosaicGPT(PreTrainedModel):
             S <= self.config.max_seq_len
         ), f'Cannot forward input with seq_len={S}, this model only supports seq_len<={self.config.max_seq_len}'
 
-        tok_emb = self.transformer.wte(input_ids)  # type: ignore
+        # submodule lookups go through nn.Module.__getattr__ so they are
+        # bound once here instead of on every access
+        transformer = self.transformer
+        wte = transformer.wte
+        emb_drop = transformer.emb_drop
+        assert isinstance(wte, nn.Module)  # pyright
+        assert isinstance(emb_drop, nn.Module)  # pyright
+
+        tok_emb = wte(input_ids)
         if self.alibi:
             x = tok_emb
         else:
@@ -322,10 +371,8 @@ class MosaicGPT(PreTrainedModel):
                     f'Cannot forward input with past sequence length {past_position} and current sequence length '
                     f'{S + 1}, this model only supports total sequence length <= {self.config.max_seq_len}.'
                 )
-            pos = torch.arange(past_position,
-                               S + past_position,
-                               dtype=torch.long,
-                               device=input_ids.device).unsqueeze(0)
+            pos = self._position_ids(input_ids.device)[:, past_position:S +
+                                                       past_position]
             if attention_mask is not None:
                 # adjust the position indices to account for padding tokens
                 pos = torch.clamp(pos - torch.cumsum(
@@ -333,17 +380,22 @@ class MosaicGPT(PreTrainedModel):
                                                               past_position:],
                                   min=0)
 
-            pos_emb = self.transformer.wpe(pos)  # type: ignore
-            x = tok_emb + pos_emb
+            pos_emb = transformer.wpe(pos)  # type: ignore
+            # tok_emb is not saved for backward by the embedding lookup so the
+            # position embedding can be added in place
+            x = tok_emb.add_(pos_emb)
 
         if self.embedding_fraction == 1:
-            x = self.transformer.emb_drop(x)  # type: ignore
+            x = emb_drop(x)
         else:
-            # this implementation is proposed on page 7 of the GLM-130B paper https://arxiv.org/abs/2210.02414
-            x_shrunk = (x * self.embedding_fraction) + (
-                x.detach() * (1 - self.embedding_fraction))
-            assert isinstance(self.transformer.emb_drop, nn.Module)  # pyright
-            x = self.transformer.emb_drop(x_shrunk)
+            # page 7 of the GLM-130B paper https://arxiv.org/abs/2210.02414
+            # proposes x * f + x.detach() * (1 - f), which is x in the forward
+            # pass with its gradient scaled by f; scaling the gradient with a
+            # hook gives the same result without the extra elementwise kernels
+            if x.requires_grad:
+                embedding_fraction = self.embedding_fraction
+                x.register_hook(lambda grad: grad * embedding_fraction)
+            x = emb_drop(x)
 
         attn_bias, attention_mask = self._attn_bias(
             device=x.device,
@@ -358,7 +410,7 @@ class MosaicGPT(PreTrainedModel):
                               ]  # type: ignore
 
         all_hidden_states = () if output_hidden_states else None
-        for b_idx, block in enumerate(self.transformer.blocks):  # type: ignore
+        for b_idx, block in enumerate(transformer.blocks):  # type: ignore
             if output_hidden_states:
                 assert all_hidden_states is not None  # pyright
                 all_hidden_states = all_hidden_states + (x,)
@@ -372,12 +424,11 @@ class MosaicGPT(PreTrainedModel):
             if past_key_values is not None:
                 past_key_values[b_idx] = past_key_value
 
-        x = self.transformer.norm_f(x)  # type: ignore
+        x = transformer.norm_f(x)  # type: ignore
 
         # output embedding weight tied to input embedding
-        assert isinstance(self.transformer.wte, nn.Module)  # pyright
-        assert isinstance(self.transformer.wte.weight, torch.Tensor)  # pyright
-        logits = F.linear(x, self.transformer.wte.weight, None)
+        assert isinstance(wte.weight, torch.Tensor)  # pyright
+        logits = F.linear(x, wte.weight, None)
 
         if self.logit_scale is not None:
             if self.logit_scale == 0:
@@ -404,6 +455,13 @@ class MosaicGPT(PreTrainedModel):
 
     # Activation Checkpointing
     def activation_checkpointing_fn(self, module):
+        if self.config.activation_checkpointing_target == 'attn':
+            return isinstance(
+                module,
+                (attention.MultiheadAttention, attention.MultiQueryAttention))
+        elif self.config.activation_checkpointing_target == 'norm':
+            return any(module is block.norm_1 or module is block.norm_2
+                       for block in self.transformer.blocks)  # type: ignore
         return isinstance(module, gpt_blocks.GPTBlock)
 
     def prepare_inputs_for_generation(self,
@@ -499,6 +557,11 @@ class ComposerMosaicGPT(HuggingFaceModel):
         )
 
         self.n_active_params = sum(p.numel() for p in self.parameters())
+        # the position embedding is a lookup which does no matmul FLOPs (the
+        # tied wte weight is counted once, for the output projection)
+        n_wpe_params = 0 if hf_config.alibi else (
+            model.transformer.wpe.weight.numel())  # type: ignore
+        self.n_flops_params = self.n_active_params - n_wpe_params
 
         loss_fn_config = om_model_config.get('loss_fn', 'fused_crossentropy')
         if loss_fn_config == 'fused_crossentropy':
@@ -518,8 +581,9 @@ class ComposerMosaicGPT(HuggingFaceModel):
             )
 
     def get_targets(self, batch):
-        targets = torch.roll(batch['labels'], shifts=-1)
-        targets[:, -1] = -100
+        labels = batch['labels']
+        targets = labels.new_full(labels.shape, -100)
+        targets[:, :-1] = labels[:, 1:]
         return targets
 
     def forward(self, batch):
@@ -548,7 +612,7 @@ class ComposerMosaicGPT(HuggingFaceModel):
         # assume the backward pass is approximately 2x the forward pass
 
         bs, msl = batch['input_ids'].shape[0:2]
-        params_flops_per_token = 2 * self.n_active_params
+        params_flops_per_token = 2 * self.n_flops_params
         params_flops_per_seq = params_flops_per_token * msl
         attn_flops_per_seq = self.model.config.n_layers * 2 * 2 * (
             self.model.config.d_model * (msl**2))
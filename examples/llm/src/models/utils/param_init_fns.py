@@ -152,6 +152,10 @@ def generic_param_init_fn_(
             torch.nn.init.ones_(module.weight)  # type: ignore
         if hasattr(module, 'bias') and module.bias is not None:
             torch.nn.init.zeros_(module.bias)  # type: ignore
+        if hasattr(module, 'zero_bias'):
+            # FusedLayerNorm's stand-in bias is left uninitialized when a
+            # model initialized on the meta device is materialized
+            torch.nn.init.zeros_(module.zero_bias)  # type: ignore
 
     elif isinstance(module, nn.MultiheadAttention):
         # torch's MultiheadAttention
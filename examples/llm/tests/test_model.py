@@ -1086,3 +1086,195 @@ def test_alibi_vs_hf():
             alibi_bias_m = alibi_bias_m[0]
 
             torch.testing.assert_close(alibi_bias_hf, alibi_bias_m)
+
+
+@pytest.mark.parametrize('mlp_act', ['gelu', 'gelu_tanh', 'swiglu'])
+def test_mlp_act(mlp_act):
+    from examples.llm.src.models.layers import GPTMLP
+
+    reproducibility.seed_all(1111)
+    mlp = GPTMLP(d_model=32, mlp_ratio=4, mlp_act=mlp_act)
+    assert (mlp.mlp_gate is not None) == (mlp_act == 'swiglu')
+
+    x = torch.randn(2, 16, 32)
+    up = mlp.mlp_up(x)
+    if mlp_act == 'swiglu':
+        assert mlp.mlp_gate is not None  # pyright
+        h = nn.functional.silu(mlp.mlp_gate(x)) * up
+    else:
+        approximate = 'tanh' if mlp_act == 'gelu_tanh' else 'none'
+        h = nn.functional.gelu(up, approximate=approximate)
+    torch.testing.assert_close(mlp(x), mlp.mlp_down(h))
+
+
+@pytest.mark.parametrize('mlp_act', ['gelu', 'swiglu'])
+def test_flash_mlp_requires_gelu_tanh(mlp_act):
+    # the fused kernel always computes the tanh approximated GELU
+    with pytest.raises(NotImplementedError):
+        MosaicGPTConfig(mlp_impl='flash', mlp_act=mlp_act)
+
+
+@pytest.mark.gpu
+def test_fused_mlp():
+    # compare the flash-attn fused MLP with its (tanh approximated GELU)
+    # torch equivalent
+    try:
+        from flash_attn.ops import fused_dense  # type: ignore
+    except ImportError:
+        pytest.skip('flash-attn fused dense kernels were not installed')
+
+    from examples.llm.src.models.layers import GPTMLP
+
+    reproducibility.seed_all(1111)
+    mlp_0 = GPTMLP(d_model=128,
+                   mlp_ratio=4,
+                   mlp_impl='torch',
+                   mlp_act='gelu_tanh').to('cuda')
+    mlp_1 = GPTMLP(d_model=128,
+                   mlp_ratio=4,
+                   mlp_impl='flash',
+                   mlp_act='gelu_tanh').to('cuda')
+    mlp_1.load_state_dict(mlp_0.state_dict())
+
+    x0 = torch.randn(2, 16, 128, device='cuda', requires_grad=True)
+    x1 = x0.detach().clone().requires_grad_(True)
+    with torch.autocast(device_type='cuda', dtype=torch.bfloat16):
+        y0 = mlp_0(x0)
+        y1 = mlp_1(x1)
+    torch.testing.assert_close(y0, y1, rtol=1e-2, atol=1e-2)
+
+    y0.sum().backward()
+    y1.sum().backward()
+    torch.testing.assert_close(x0.grad, x1.grad, rtol=1e-2, atol=1e-2)
+
+
+@pytest.mark.gpu
+def test_fused_layernorm():
+    # compare the flash-attn fused (residual add +) LayerNorm with torch
+    try:
+        from flash_attn.ops import layer_norm  # type: ignore
+    except ImportError:
+        pytest.skip('flash-attn fused layer norm kernels were not installed')
+
+    from examples.llm.src.models.layers import FusedLayerNorm
+
+    reproducibility.seed_all(1111)
+    norm_0 = nn.LayerNorm(128).to('cuda')
+    norm_1 = FusedLayerNorm(128).to('cuda')
+    norm_1.load_state_dict(norm_0.state_dict())
+
+    x0 = torch.randn(2, 16, 128, device='cuda', requires_grad=True)
+    x1 = x0.detach().clone().requires_grad_(True)
+    torch.testing.assert_close(norm_0(x0), norm_1(x1))
+
+    # the attn residual (dropout +) add is fused into norm_2 of GPTBlock
+    r0 = torch.randn(2, 16, 128, device='cuda', requires_grad=True)
+    r1 = r0.detach().clone().requires_grad_(True)
+    s0 = r0 + x0
+    y0 = norm_0(s0)
+    y1, s1 = norm_1(x1, residual=r1, prenorm=True)
+    torch.testing.assert_close(y0, y1)
+    torch.testing.assert_close(s0, s1)
+
+    (y0.sum() + s0.sum()).backward()
+    (y1.sum() + s1.sum()).backward()
+    torch.testing.assert_close(x0.grad, x1.grad)
+    torch.testing.assert_close(r0.grad, r1.grad)
+
+
+@pytest.mark.parametrize('d_model', [36, 6400])
+def test_fused_layernorm_requires_supported_d_model(d_model):
+    with pytest.raises(ValueError):
+        MosaicGPTConfig(d_model=d_model, n_heads=4, norm_type='fused_layernorm')
+
+
+@pytest.mark.parametrize('activation_checkpointing_target',
+                         ['block', 'attn', 'norm'])
+def test_activation_checkpointing_target(activation_checkpointing_target):
+    hf_config = MosaicGPTConfig(
+        init_device='cpu',
+        d_model=32,
+        n_heads=2,
+        n_layers=2,
+        mlp_ratio=2,
+        max_seq_len=32,
+        attn_impl='torch',
+        activation_checkpointing_target=activation_checkpointing_target,
+    )
+    mosaic_gpt = MosaicGPT(hf_config)
+
+    checkpointed = [
+        m for m in mosaic_gpt.modules()
+        if mosaic_gpt.activation_checkpointing_fn(m)
+    ]
+    expected = []
+    for block in mosaic_gpt.transformer.blocks:  # type: ignore
+        if activation_checkpointing_target == 'attn':
+            expected.append(block.attn)
+        elif activation_checkpointing_target == 'norm':
+            expected.extend([block.norm_1, block.norm_2])
+        else:
+            expected.append(block)
+    assert len(checkpointed) == len(expected)
+    for module, expected_module in zip(checkpointed, expected):
+        assert module is expected_module
+
+
+@pytest.mark.parametrize('embedding_fraction', [0.1, 0.5])
+def test_embedding_fraction(embedding_fraction):
+    grads = []
+    for fraction in [1.0, embedding_fraction]:
+        reproducibility.seed_all(1111)
+        hf_config = MosaicGPTConfig(
+            init_device='cpu',
+            d_model=32,
+            n_heads=2,
+            n_layers=2,
+            mlp_ratio=2,
+            max_seq_len=32,
+            emb_pdrop=0.0,
+            resid_pdrop=0.0,
+            attn_pdrop=0.0,
+            attn_impl='torch',
+            alibi=False,
+            embedding_fraction=fraction,
+        )
+        mosaic_gpt = MosaicGPT(hf_config)
+        input_ids = torch.randint(0, hf_config.vocab_size, (2, 16))
+
+        outputs = mosaic_gpt(input_ids, output_hidden_states=True)
+        # the output projection is tied to wte; backprop from a hidden state
+        # so that only the embedding contributes to the gradient of wte
+        outputs.hidden_states[-1].pow(2).sum().backward()
+        grads.append((mosaic_gpt.transformer.wte.weight.grad,
+                      mosaic_gpt.transformer.wpe.weight.grad))
+
+    for grad_1, grad_f in zip(*grads):
+        torch.testing.assert_close(grad_f, embedding_fraction * grad_1)
+
+
+@pytest.mark.parametrize('alibi', [True, False])
+def test_flops_per_batch(alibi):
+    test_cfg = get_config(conf_path='yamls/mosaic_gpt/testing.yaml')
+    test_cfg.model.init_device = 'cpu'
+    test_cfg.model.alibi = alibi
+    model = COMPOSER_MODEL_REGISTRY[test_cfg.model.name](test_cfg.model,
+                                                         test_cfg.tokenizer)
+
+    n_params = sum(p.numel() for p in model.parameters())
+    if alibi:
+        assert not hasattr(model.model.transformer, 'wpe')
+        n_flops_params = n_params
+    else:
+        # the position embedding is a lookup and does no matmul FLOPs
+        n_flops_params = n_params - model.model.transformer.wpe.weight.numel()
+    assert model.n_flops_params == n_flops_params
+
+    bs, msl = 2, test_cfg.max_seq_len
+    batch = {
+        'input_ids': torch.randint(0, test_cfg.model.vocab_size, (bs, msl))
+    }
+    attn_flops_per_seq = test_cfg.model.n_layers * 2 * 2 * (
+        test_cfg.model.d_model * (msl**2))
+    expected = (2 * n_flops_params * msl + attn_flops_per_seq) * 3 * bs
+    assert model.flops_per_batch(batch) == expected
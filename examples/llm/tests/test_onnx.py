@@ -1,6 +1,7 @@
 # Copyright 2022 MosaicML Examples authors
 # SPDX-License-Identifier: Apache-2.0
 
+import pytest
 import torch
 from composer.utils import reproducibility
 from transformers import AutoConfig, AutoModelForCausalLM
@@ -91,3 +92,62 @@ def test_onnx_export(tmp_path):
         atol=1e-4,
         msg=f'output mismatch between the orig and onnx exported model',
     )
+
+
+@pytest.mark.parametrize('export_padded', [False, True])
+def test_onnx_export_padded(tmp_path, export_padded: bool):
+    reproducibility.seed_all(42)
+
+    hf_config = MosaicGPTConfig(
+        init_device='cpu',
+        d_model=128,
+        n_heads=4,
+        n_layers=2,
+        mlp_ratio=2,
+        max_seq_len=256,
+        emb_pdrop=0.0,
+        resid_pdrop=0.0,
+        attn_impl='torch',
+        alibi=False,
+        use_cache=True,
+        vocab_size=50368,
+        low_precision_layernorm=False,
+    )
+    mosaic_gpt = MosaicGPT(hf_config)
+    mosaic_gpt.eval()
+
+    sample_input = gen_random_batch(2, 50368, 256)
+    padded_input = {k: v.clone() for k, v in sample_input.items()}
+    padded_input['attention_mask'][0, -64:] = False
+    padded_input['attention_mask'][1, -17:] = False
+
+    # the HF to ONNX conversion script exports with an all True mask; the
+    # exported graph must still read the mask it is run with
+    export_input = padded_input if export_padded else sample_input
+    torch.onnx.export(
+        mosaic_gpt,
+        (export_input,),
+        str(tmp_path / 'mosaic_gpt.onnx'),
+        input_names=['input_ids', 'attention_mask'],
+        output_names=['output'],
+        opset_version=16,
+    )
+
+    import onnxruntime as ort  # type: ignore
+
+    ort_session = ort.InferenceSession(str(tmp_path / 'mosaic_gpt.onnx'))
+
+    for batch in [padded_input, sample_input]:
+        with torch.no_grad():
+            orig_out = mosaic_gpt(**batch)
+
+        loaded_model_out = ort_session.run(
+            None, {k: v.cpu().numpy() for k, v in batch.items()})
+
+        torch.testing.assert_close(
+            orig_out.logits.detach().numpy(),
+            loaded_model_out[0],
+            rtol=1e-4,
+            atol=1e-4,
+            msg=f'output mismatch between the orig and onnx exported model',
+        )
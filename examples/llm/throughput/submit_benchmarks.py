@@ -2,6 +2,8 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import argparse
+import copy
+import functools
 import math
 import os
 
@@ -10,6 +12,12 @@ import yaml
 from mcli.models.run_config import SchedulingConfig
 from mcli.sdk import RunConfig, create_run, get_clusters
 
+try:
+    # libyaml backed loader
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 
 def _get_cluster_info():
     clusters = get_clusters()
@@ -183,16 +191,25 @@ def get_global_train_batch_sizes(max_seq_len, pows, batch_sizes=[]):
 
 
 def get_parameters(yaml_file):
+    # mod_parameters modifies the parameters in place so each run gets its own
+    # copy of the cached yaml
+    return copy.deepcopy(_load_parameters(yaml_file))
+
+
+@functools.lru_cache(maxsize=None)
+def _load_parameters(yaml_file):
+    # every run of the sweep uses one of a handful of model yamls; only read
+    # (or download) and parse each of them once
     local_yamls = False if 'https' in yaml_file else True
     if local_yamls:
         # Load the YAML into a parameters dictionary
         with open(yaml_file) as f:
-            parameters = yaml.safe_load(f)
+            parameters = yaml.load(f, Loader=SafeLoader)
     else:
         # Download parameter yaml
         req = requests.get(yaml_file)
         # Load the YAML into a parameters dictionary
-        parameters = yaml.safe_load(req.text)
+        parameters = yaml.load(req.text, Loader=SafeLoader)
 
     return parameters
 
@@ -339,6 +356,17 @@ def get_integrations(project, git_branch=None, git_commit=None, wandb=True):
     return integrations
 
 
+@functools.lru_cache(maxsize=None)
+def get_model_name(model_yaml):
+    # only depends on the model yaml; parsed once per model for the sweep
+    model_name = '-'.join(model_yaml.split('.')[-2].split('/')[-2:]).replace(
+        '_', '-')
+    model_name = model_name.split('-')
+    if 'mosaic' in model_name:
+        model_name.pop(model_name.index('mosaic'))
+    return ''.join(model_name)
+
+
 def run_config(config, args):
     model_yaml, max_seq_len, global_train_batch_size, cluster, gpu_type, gpu_num, precision = config
 
@@ -367,12 +395,7 @@ def run_config(config, args):
     path = os.path.join('../yamls/mosaic_gpt', model_yaml)
     parameters = get_parameters(path)
 
-    model_name = '-'.join(model_yaml.split('.')[-2].split('/')[-2:]).replace(
-        '_', '-')
-    model_name = model_name.split('-')
-    if 'mosaic' in model_name:
-        model_name.pop(model_name.index('mosaic'))
-    model_name = ''.join(model_name)
+    model_name = get_model_name(model_yaml)
     name = f"{args.project}-{cluster}-{model_name}-{gpu_num}x{gpu_type}-s{max_seq_len}b{global_train_batch_size}{precision.replace('amp_', '')}".replace(
         '_', '-')
 
@@ -90,6 +90,15 @@ for name in _EXAMPLE_SUBDIRS:
                                                         lines,
                                                         cpu_only=True)
 
+# opt-in fused CUDA kernels for the llm example; these are compiled from source
+# so they are not part of the default llm requirements
+extra_deps['llm-fused-mlp'] = extra_deps['llm'] + [
+    'fused-dense-lib@git+https://github.com/HazyResearch/flash-attention.git@v1.0.3.post0#subdirectory=csrc/fused_dense_lib',
+]  # mlp_impl: flash
+extra_deps['llm-fused-layernorm'] = extra_deps['llm'] + [
+    'dropout-layer-norm@git+https://github.com/HazyResearch/flash-attention.git@v1.0.3.post0#subdirectory=csrc/layer_norm',
+]  # norm_type: fused_layernorm
+
 setup(
     name=_PACKAGE_NAME,
     version=repo_version,